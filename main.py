@@ -5,7 +5,7 @@ from pathlib import Path
 
 from src.load_data import ensure_dirs, write_readme_seed_hint
 from src.synthetic_data import generate_synthetic_tickets_csv
-from src.feature_engineering import build_daily_series
+from src.feature_engineering import build_series_validated
 
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -27,17 +27,26 @@ def cmd_make_data() -> None:
         daily_max=140,
     )
 
-    # Build daily aggregation for modeling
+    # Validate (ids/duplicates/dictionaries) and build daily/hourly aggregations in one pass
     processed_daily_path = DATA_PROCESSED / "tickets_daily.csv"
-    df_daily = build_daily_series(raw_csv_path=raw_path)
+    processed_hourly_path = DATA_PROCESSED / "tickets_hourly.csv"
+    rejects_path = DATA_PROCESSED / "tickets_rejects.csv"
+    df_daily, df_hourly, counters = build_series_validated(raw_csv_path=raw_path, rejects_csv_path=rejects_path)
     df_daily.to_csv(processed_daily_path, index=False)
+    df_hourly.to_csv(processed_hourly_path, index=False)
 
     write_readme_seed_hint()
     print(f"[OK] Dataset gerado: {raw_path}")
+    print(f"[OK] Validação: {counters['rows_valid']}/{counters['rows_read']} linhas válidas")
+    for reason, n in counters.items():
+        if reason not in ("rows_read", "rows_valid") and n:
+            print(f" - {reason}: {n}")
+    print(f"[OK] Rejeitados salvos em: {rejects_path}")
     print(f"[OK] Série diária gerada: {processed_daily_path}")
+    print(f"[OK] Série horária gerada: {processed_hourly_path}")
 
 
-def cmd_train() -> None:
+def cmd_train(mask_anomalies: bool = False) -> None:
     ensure_dirs(BASE_DIR)
 
     import pandas as pd
@@ -105,7 +114,9 @@ def cmd_train() -> None:
     from src.model import train_random_forest, save_artifacts
     from src.evaluate import make_metrics
 
-    pipe, meta = train_random_forest(df, test_days=28, seed=42)
+    pipe, meta = train_random_forest(df, test_days=28, seed=42, mask_anomalies=mask_anomalies)
+    if mask_anomalies:
+        print(f"[OK] Dias anômalos removidos do treino: {len(meta['masked_train_dates'])}")
 
     y_test = pd.Series(meta["y_test"])
     pred_ml = pd.Series(meta["pred"])
@@ -158,9 +169,77 @@ def cmd_report() -> None:
     print(f"[OK] Relatório gerado em: {out_md}")
 
 
-def cmd_all() -> None:
+def cmd_detect_anomalies() -> None:
+    ensure_dirs(BASE_DIR)
+
+    import pandas as pd
+    from src.anomaly import flag_anomalies
+
+    daily_path = DATA_PROCESSED / "tickets_daily.csv"
+    hourly_path = DATA_PROCESSED / "tickets_hourly.csv"
+    if not daily_path.exists() or not hourly_path.exists():
+        raise FileNotFoundError(f"Não encontrei {daily_path} / {hourly_path}. Rode antes: python main.py --make-data")
+
+    df = pd.read_csv(daily_path)
+    df["date"] = pd.to_datetime(df["date"])
+    daily = flag_anomalies(df, period=7)
+
+    # horária: mesma hora do mesmo dia da semana (ciclo de 168h); contagens baixas -> só mediana/MAD
+    df_hourly = pd.read_csv(hourly_path)
+    df_hourly["hour"] = pd.to_datetime(df_hourly["hour"])
+    hourly = flag_anomalies(df_hourly, time_col="hour", period=168, range_margin=None)
+
+    out_daily = OUTPUTS / "reports" / "anomalies_daily.csv"
+    out_hourly = OUTPUTS / "reports" / "anomalies_hourly.csv"
+    daily[daily["is_anomaly"]].to_csv(out_daily, index=False)
+    hourly[hourly["is_anomaly"]].to_csv(out_hourly, index=False)
+
+    print(f"[OK] Dias anômalos: {int(daily['is_anomaly'].sum())} -> {out_daily}")
+    print(f"[OK] Horas anômalas: {int(hourly['is_anomaly'].sum())} -> {out_hourly}")
+
+
+def cmd_simulate(capacity: float, n_paths: int, horizon: int) -> None:
+    ensure_dirs(BASE_DIR)
+
+    import pandas as pd
+    from src.simulation import fit_demand_params, fit_hourly_profile, estimate_overflow_risk
+
+    daily_path = DATA_PROCESSED / "tickets_daily.csv"
+    if not daily_path.exists():
+        raise FileNotFoundError(f"Não encontrei {daily_path}. Rode antes: python main.py --make-data")
+
+    df = pd.read_csv(daily_path)
+    df["date"] = pd.to_datetime(df["date"])
+
+    # perfil horário vem da série horária validada (se existir); senão, usa o do gerador
+    hourly_path = DATA_PROCESSED / "tickets_hourly.csv"
+    hour_profile = fit_hourly_profile(pd.read_csv(hourly_path)) if hourly_path.exists() else None
+    params = fit_demand_params(df, hour_profile=hour_profile)
+
+    start = df["date"].max() + pd.Timedelta(days=1)
+    risk = estimate_overflow_risk(params, start, horizon=horizon, capacity=capacity, n_paths=n_paths, seed=42)
+
+    out_csv = OUTPUTS / "reports" / "simulation_overflow.csv"
+    risk["by_day"].to_csv(out_csv, index=False)
+
+    print(f"[OK] Simulação Monte Carlo: {n_paths} cenários x {horizon} dias (capacidade={capacity:g}/dia)")
+    print(f" - P(algum dia acima da capacidade) = {risk['p_any_over']:.2%}")
+    print(f" - Pior dia: P(volume > capacidade) = {risk['by_day']['p_over'].max():.2%}")
+    print(f"[OK] Risco por dia salvo em: {out_csv}")
+
+
+def cmd_check_fit() -> None:
+    from src.simulation import check_fit_recovery
+
+    res = check_fit_recovery()
+    print(f"[OK] Ajuste do simulador recupera os parâmetros ({len(res)} séries geradas):")
+    print(f" - incident_prob: {res['incident_prob'].mean():.4f} (verdadeiro {res.attrs['true_incident_prob']:.4f})")
+    print(f" - p_any_over:    {res['p_any_over'].mean():.3f} (verdadeiro {res.attrs['true_p_any_over']:.3f})")
+
+
+def cmd_all(mask_anomalies: bool = False) -> None:
     cmd_make_data()
-    cmd_train()
+    cmd_train(mask_anomalies=mask_anomalies)
     cmd_report()
 
 
@@ -172,26 +251,39 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--train", action="store_true", help="Treina baseline/modelo e salva artefatos.")
     parser.add_argument("--report", action="store_true", help="Gera gráficos e relatório.")
     parser.add_argument("--all", action="store_true", help="Roda pipeline completo.")
+    parser.add_argument("--detect-anomalies", action="store_true", help="Marca dias/horas anômalos (incidentes).")
+    parser.add_argument("--mask-anomalies", action="store_true", help="Remove dias anômalos (incidentes) das features/treino.")
+    parser.add_argument("--simulate", action="store_true", help="Simula cenários de demanda e risco de estouro.")
+    parser.add_argument("--check-fit", action="store_true", help="Checa se o ajuste do simulador recupera parâmetros conhecidos.")
+    parser.add_argument("--capacity", type=float, default=150, help="Capacidade diária (chamados/dia) para --simulate.")
+    parser.add_argument("--paths", type=int, default=100_000, help="Número de cenários para --simulate.")
+    parser.add_argument("--horizon", type=int, default=28, help="Horizonte em dias para --simulate.")
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
 
-    if not any([args.make_data, args.train, args.report, args.all]):
-        print("Nenhuma opção informada. Use: --make-data, --train, --report ou --all")
+    if not any([args.make_data, args.train, args.report, args.all, args.simulate, args.detect_anomalies, args.check_fit]):
+        print("Nenhuma opção informada. Use: --make-data, --train, --report, --detect-anomalies, --simulate, --check-fit ou --all")
         return
 
     if args.all:
-        cmd_all()
+        cmd_all(mask_anomalies=args.mask_anomalies)
         return
 
     if args.make_data:
         cmd_make_data()
     if args.train:
-        cmd_train()
+        cmd_train(mask_anomalies=args.mask_anomalies)
     if args.report:
         cmd_report()
+    if args.detect_anomalies:
+        cmd_detect_anomalies()
+    if args.simulate:
+        cmd_simulate(capacity=args.capacity, n_paths=args.paths, horizon=args.horizon)
+    if args.check_fit:
+        cmd_check_fit()
 
 
 if __name__ == "__main__":
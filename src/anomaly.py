@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# MAD -> desvio padrão (consistente com a normal)
+MAD_SCALE = 1.4826
+
+
+# Padrões validados contra os incidentes injetados pelo gerador (seed 42 + 7 seeds extras):
+# janelas curtas (8 ciclos) deixam o MAD instável e marcam dias normais como incidente.
+DEFAULT_WINDOW = 16
+DEFAULT_THRESHOLD = 3.0
+DEFAULT_MIN_HISTORY = 8
+DEFAULT_POISSON_FLOOR = 2.0
+DEFAULT_RANGE_MARGIN = 0.15
+
+# elementos de janela (série x tempo x window) por bloco no lote: cada cópia temporária
+# de _robust_stats custa ~32 MB, independente do número de séries
+_BLOCK_WINDOW_ELEMENTS = 4_000_000
+
+
+@dataclass
+class AnomalyResult:
+    expected: np.ndarray  # mediana móvel (mesma fase do ciclo)
+    score: np.ndarray  # (valor - mediana) / escala robusta
+    is_anomaly: np.ndarray  # bool
+
+
+def _nanmedian_last(a: np.ndarray) -> np.ndarray:
+    """
+    Mediana ignorando NaN no último eixo. np.sort joga os NaN para o fim, então basta
+    indexar o(s) elemento(s) do meio de cada janela (bem mais rápido que np.nanmedian).
+    """
+    s = np.sort(a, axis=-1)
+    n = np.sum(~np.isnan(a), axis=-1, keepdims=True)
+    lo = np.take_along_axis(s, np.maximum((n - 1) // 2, 0), axis=-1)
+    hi = np.take_along_axis(s, np.maximum(n // 2, 0), axis=-1)
+    med = np.where(n > 0, (lo + hi) / 2, np.nan)
+    return med[..., 0]
+
+
+def _robust_stats(
+    windows: np.ndarray,
+    axis: int,
+    min_scale: float,
+    poisson_floor: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mediana, escala robusta, máximo e nº de observações válidas ao longo de axis.
+    Escala = max(1.4826 * MAD, poisson_floor * sqrt(mediana), min_scale): o piso de
+    Poisson evita que o MAD colapse após semanas parecidas.
+    """
+    w = np.moveaxis(windows, axis, -1)
+    med = _nanmedian_last(w)
+    mad = _nanmedian_last(np.abs(w - med[..., None]))
+    # janelas ainda vazias (warm-up) ficam com med/mad NaN
+    level = np.nan_to_num(med, nan=0.0)
+    scale = np.maximum(MAD_SCALE * np.nan_to_num(mad, nan=0.0), poisson_floor * np.sqrt(np.maximum(level, 0.0)))
+    scale = np.maximum(scale, min_scale)
+    upper = np.max(np.where(np.isnan(w), -np.inf, w), axis=-1)
+    n_obs = np.sum(~np.isnan(w), axis=-1)
+    return med, scale, upper, n_obs
+
+
+def _flag(
+    values: np.ndarray,
+    med: np.ndarray,
+    scale: np.ndarray,
+    upper: np.ndarray,
+    n_obs: np.ndarray,
+    threshold: float,
+    min_history: int,
+    direction: str,
+    range_margin: float | None,
+) -> AnomalyResult:
+    score = (values - med) / scale
+    if direction == "high":
+        hit = score > threshold
+    elif direction == "both":
+        hit = np.abs(score) > threshold
+    else:
+        raise ValueError("direction deve ser 'high' ou 'both'.")
+    if range_margin is not None:
+        # bem acima do maior valor da janela também é pico (ruído largo, ex.: base uniforme);
+        # score > 1 evita disparar em contagens pequenas (ex.: 3 vs máximo 2)
+        hit |= (values > upper * (1.0 + range_margin)) & (score > 1.0)
+    # NaN (warm-up ou valor ausente) nunca é anomalia
+    is_anomaly = hit & (n_obs >= min_history) & ~np.isnan(score)
+    return AnomalyResult(expected=med, score=score, is_anomaly=is_anomaly)
+
+
+class StreamingAnomalyDetector:
+    """
+    Detector online para contagens agregadas (dia ou hora), vetorizado entre séries.
+    Compara cada valor com a mediana/MAD dos últimos `window` valores da mesma fase
+    do ciclo (period=7 para dias: mesmo dia da semana; period=168 para horas: mesma
+    hora do mesmo dia da semana). Também marca valores mais de range_margin acima do
+    máximo da janela (None desliga; recomendado para séries horárias, de contagens baixas).
+    Custo por update: O(window * n_series), independente do tamanho do histórico.
+    """
+
+    def __init__(
+        self,
+        n_series: int = 1,
+        period: int = 7,
+        window: int = DEFAULT_WINDOW,
+        threshold: float = DEFAULT_THRESHOLD,
+        min_history: int = DEFAULT_MIN_HISTORY,
+        direction: str = "high",
+        min_scale: float = 1.0,
+        poisson_floor: float = DEFAULT_POISSON_FLOOR,
+        range_margin: float | None = DEFAULT_RANGE_MARGIN,
+    ) -> None:
+        if period < 1 or window < 1:
+            raise ValueError("period e window precisam ser >= 1.")
+        self.n_series = n_series
+        self.period = period
+        self.window = window
+        self.threshold = threshold
+        self.min_history = min_history
+        self.direction = direction
+        self.min_scale = min_scale
+        self.poisson_floor = poisson_floor
+        self.range_margin = range_margin
+
+        # buffer circular por fase: (period, window, n_series)
+        self._buf = np.full((period, window, n_series), np.nan)
+        self._pos = np.zeros(period, dtype=np.int64)
+        self._t = 0
+
+    def update(self, values: np.ndarray | float) -> AnomalyResult:
+        """Processa um passo de tempo (um valor por série) e retorna o resultado."""
+        x = np.broadcast_to(np.asarray(values, dtype=float), (self.n_series,))
+        phase = self._t % self.period
+        buf = self._buf[phase]
+
+        med, scale, upper, n_obs = _robust_stats(
+            buf, axis=0, min_scale=self.min_scale, poisson_floor=self.poisson_floor
+        )
+        result = _flag(
+            x, med, scale, upper, n_obs, self.threshold, self.min_history, self.direction, self.range_margin
+        )
+
+        buf[self._pos[phase]] = x
+        self._pos[phase] = (self._pos[phase] + 1) % self.window
+        self._t += 1
+        return result
+
+
+def _batch_stats(
+    x: np.ndarray,
+    period: int,
+    window: int,
+    min_scale: float,
+    poisson_floor: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Estatísticas de janela (n_series, n_time) de um bloco de séries, sem loop no tempo."""
+    n_series, n_time = x.shape
+
+    # (n_series, n_cycles, period), completando o último ciclo com NaN
+    n_cycles = -(-n_time // period)
+    padded = np.full((n_series, n_cycles * period), np.nan)
+    padded[:, :n_time] = x
+    cycles = padded.reshape(n_series, n_cycles, period)
+
+    # `window` ciclos vazios antes do início -> janela dos ciclos anteriores de cada ciclo
+    history = np.concatenate([np.full((n_series, window, period), np.nan), cycles], axis=1)
+    windows = sliding_window_view(history, window, axis=1)[:, :n_cycles]
+
+    stats = _robust_stats(windows, axis=-1, min_scale=min_scale, poisson_floor=poisson_floor)
+    med, scale, upper, n_obs = (a.reshape(n_series, -1)[:, :n_time] for a in stats)
+    return med, scale, upper, n_obs
+
+
+def detect_anomalies_batch(
+    values: np.ndarray,
+    period: int = 7,
+    window: int = DEFAULT_WINDOW,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_history: int = DEFAULT_MIN_HISTORY,
+    direction: str = "high",
+    min_scale: float = 1.0,
+    poisson_floor: float = DEFAULT_POISSON_FLOOR,
+    range_margin: float | None = DEFAULT_RANGE_MARGIN,
+) -> AnomalyResult:
+    """
+    Versão em lote do StreamingAnomalyDetector (mesmo resultado, sem loop no tempo).
+    values: (n_time,) ou (n_series, n_time); NaN = valor ausente.
+    As janelas são materializadas em blocos de séries (_BLOCK_WINDOW_ELEMENTS), então
+    o pico de memória não cresce com o número de séries.
+    """
+    x = np.asarray(values, dtype=float)
+    squeeze = x.ndim == 1
+    x = np.atleast_2d(x)
+    n_series, n_time = x.shape
+
+    expected = np.empty(x.shape)
+    score = np.empty(x.shape)
+    is_anomaly = np.empty(x.shape, dtype=bool)
+
+    per_series = max(n_time + window * period, 1) * window
+    block = max(1, _BLOCK_WINDOW_ELEMENTS // per_series)
+    for lo in range(0, n_series, block):
+        xb = x[lo:lo + block]
+        med, scale, upper, n_obs = _batch_stats(xb, period, window, min_scale, poisson_floor)
+        res = _flag(xb, med, scale, upper, n_obs, threshold, min_history, direction, range_margin)
+        expected[lo:lo + block] = res.expected
+        score[lo:lo + block] = res.score
+        is_anomaly[lo:lo + block] = res.is_anomaly
+
+    if squeeze:
+        return AnomalyResult(expected[0], score[0], is_anomaly[0])
+    return AnomalyResult(expected=expected, score=score, is_anomaly=is_anomaly)
+
+
+def _time_grid(times: pd.Series, freq: str | pd.Timedelta | None) -> pd.DatetimeIndex:
+    """
+    Grade regular de tempo entre o primeiro e o último valor de times. Sem freq, o passo
+    é a menor diferença entre tempos consecutivos (ex.: 1 dia, mesmo com dias faltando).
+    """
+    uniq = pd.DatetimeIndex(times.unique()).sort_values()
+    if len(uniq) < 2:
+        return uniq
+    step = uniq.to_series().diff().min() if freq is None else freq
+    grid = pd.date_range(uniq[0], uniq[-1], freq=step)
+    if (grid.get_indexer(uniq) < 0).any():
+        raise ValueError(f"time_col fora de uma grade regular (passo {step}).")
+    return grid
+
+
+def flag_anomalies(
+    df: pd.DataFrame,
+    value_col: str = "tickets",
+    time_col: str = "date",
+    series_col: str | None = None,
+    period: int = 7,
+    window: int = DEFAULT_WINDOW,
+    threshold: float = DEFAULT_THRESHOLD,
+    min_history: int = DEFAULT_MIN_HISTORY,
+    direction: str = "high",
+    poisson_floor: float = DEFAULT_POISSON_FLOOR,
+    range_margin: float | None = DEFAULT_RANGE_MARGIN,
+    freq: str | pd.Timedelta | None = None,
+) -> pd.DataFrame:
+    """
+    Marca anomalias numa série (ou várias, via series_col) em formato longo.
+    Os valores são alinhados numa grade regular de tempo (freq, ou o menor passo entre
+    tempos): tempos ausentes viram NaN e não são marcados, sem deslocar a fase do ciclo
+    dos tempos seguintes. Tempos fora da grade levantam ValueError.
+    Adiciona colunas: expected, anomaly_score, is_anomaly.
+    """
+    keys = [series_col] if series_col else []
+    out = df.sort_values(keys + [time_col]).reset_index(drop=True)
+    grid = _time_grid(out[time_col], freq)
+
+    if series_col:
+        wide = out.pivot(index=series_col, columns=time_col, values=value_col).reindex(columns=grid)
+        rows = wide.index.get_indexer(out[series_col])
+    else:
+        wide = out.set_index(time_col)[value_col].reindex(grid).to_frame().T
+        rows = np.zeros(len(out), dtype=np.int64)
+
+    res = detect_anomalies_batch(
+        wide.to_numpy(dtype=float),
+        period=period,
+        window=window,
+        threshold=threshold,
+        min_history=min_history,
+        direction=direction,
+        poisson_floor=poisson_floor,
+        range_margin=range_margin,
+    )
+
+    # volta da matriz (série x tempo) para o formato longo
+    cols = grid.get_indexer(out[time_col])
+    out["expected"] = res.expected[rows, cols]
+    out["anomaly_score"] = res.score[rows, cols]
+    out["is_anomaly"] = res.is_anomaly[rows, cols]
+
+    return out
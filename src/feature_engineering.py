@@ -3,27 +3,94 @@ from __future__ import annotations
 from pathlib import Path
 import pandas as pd
 
+from src.validation import DEFAULT_CHUNKSIZE, iter_valid_tickets
 
-def build_daily_series(raw_csv_path: Path) -> pd.DataFrame:
+
+def _count_valid_by_hour(
+    raw_csv_path: Path,
+    rejects_csv_path: Path,
+    chunksize: int,
+) -> tuple[pd.Series, dict[str, int]]:
     """
-    Lê tickets raw (nível ticket) e agrega para série diária:
-    columns: date, tickets
+    Uma passada de validação em blocos (ids duplicados/inválidos, created_at e
+    dicionários), contando chamados válidos por hora. Agrega bloco a bloco,
+    então a memória não cresce com o tamanho do raw.
+    Retorna: contagem por hora (só horas com chamados, ordenada), contadores da validação
     """
-    df = pd.read_csv(raw_csv_path)
+    counters: dict[str, int] = {}
+    partial: list[pd.Series] = []
+
+    for chunk in iter_valid_tickets(raw_csv_path, rejects_csv_path, counters, chunksize=chunksize):
+        partial.append(chunk["created_at"].dt.floor("h").value_counts())
+
+    if not partial or not sum(len(p) for p in partial):
+        return pd.Series(dtype="int64", index=pd.DatetimeIndex([])), counters
 
-    # created_at -> datetime
-    df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce")
-    df = df.dropna(subset=["created_at"]).copy()
+    counts = pd.concat(partial).groupby(level=0).sum().sort_index()
+    return counts, counters
 
-    df["date"] = df["created_at"].dt.date
-    daily = (
-        df.groupby("date", as_index=False)
-        .size()
-        .rename(columns={"size": "tickets"})
-    )
+
+def _daily_from_hourly_counts(counts: pd.Series) -> pd.DataFrame:
+    """columns: date, tickets (só dias com chamados válidos)"""
+    daily = counts.groupby(counts.index.normalize()).sum()
+    daily = daily.rename_axis("date").reset_index(name="tickets")
 
     # garante ordenação temporal
     daily["date"] = pd.to_datetime(daily["date"])
     daily = daily.sort_values("date").reset_index(drop=True)
 
-    return daily
\ No newline at end of file
+    return daily
+
+
+def _hourly_grid(counts: pd.Series) -> pd.DataFrame:
+    """columns: hour, tickets; horas sem chamados entram com 0 (dias completos)"""
+    if counts.empty:
+        return pd.DataFrame({"hour": pd.to_datetime([]), "tickets": pd.Series(dtype="int64")})
+
+    start = counts.index.min().normalize()
+    end = counts.index.max().normalize() + pd.Timedelta(hours=23)
+    grid = pd.date_range(start, end, freq="h")
+
+    return counts.reindex(grid, fill_value=0).rename_axis("hour").reset_index(name="tickets")
+
+
+def build_daily_series_validated(
+    raw_csv_path: Path,
+    rejects_csv_path: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> tuple[pd.DataFrame, dict[str, int]]:
+    """
+    Lê tickets raw (nível ticket), valida em blocos (iter_valid_tickets) e agrega
+    para série diária: columns: date, tickets
+    Retorna: série diária, contadores da validação
+    """
+    counts, counters = _count_valid_by_hour(raw_csv_path, rejects_csv_path, chunksize)
+    return _daily_from_hourly_counts(counts), counters
+
+
+def build_hourly_series(
+    raw_csv_path: Path,
+    rejects_csv_path: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> tuple[pd.DataFrame, dict[str, int]]:
+    """
+    Igual a build_daily_series_validated, mas agregando por hora:
+    columns: hour (datetime truncado na hora), tickets
+    Horas sem chamados entram com 0 (grade regular, útil para detecção de anomalias).
+    Retorna: série horária, contadores da validação
+    """
+    counts, counters = _count_valid_by_hour(raw_csv_path, rejects_csv_path, chunksize)
+    return _hourly_grid(counts), counters
+
+
+def build_series_validated(
+    raw_csv_path: Path,
+    rejects_csv_path: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+) -> tuple[pd.DataFrame, pd.DataFrame, dict[str, int]]:
+    """
+    Séries diária e horária numa única passada de validação sobre o raw.
+    Retorna: série diária, série horária, contadores da validação
+    """
+    counts, counters = _count_valid_by_hour(raw_csv_path, rejects_csv_path, chunksize)
+    return _daily_from_hourly_counts(counts), _hourly_grid(counts), counters
@@ -13,6 +13,8 @@ from sklearn.preprocessing import OneHotEncoder
 from sklearn.impute import SimpleImputer
 from sklearn.ensemble import RandomForestRegressor
 
+from src.anomaly import flag_anomalies
+
 
 @dataclass
 class ModelArtifacts:
@@ -20,25 +22,27 @@ class ModelArtifacts:
     metadata_path: Path
 
 
-def make_features(df_daily: pd.DataFrame) -> pd.DataFrame:
+def make_features(df_daily: pd.DataFrame, source_col: str = "tickets") -> pd.DataFrame:
     """
     Features simples e eficazes para demanda diária.
     Espera: date (datetime), tickets (num)
+    source_col: coluna usada para lags/médias (ex.: série sem incidentes).
     Retorna df com colunas de features + target.
     """
     df = df_daily.sort_values("date").reset_index(drop=True).copy()
     df["dow"] = df["date"].dt.dayofweek
+    src = df[source_col]
 
     # Lags (demanda recente)
-    df["lag_1"] = df["tickets"].shift(1)
-    df["lag_7"] = df["tickets"].shift(7)
+    df["lag_1"] = src.shift(1)
+    df["lag_7"] = src.shift(7)
 
     # Médias móveis (tendência/nível)
-    df["roll_7"] = df["tickets"].rolling(7).mean()
-    df["roll_14"] = df["tickets"].rolling(14).mean()
+    df["roll_7"] = src.rolling(7).mean()
+    df["roll_14"] = src.rolling(14).mean()
 
     # Tendência simples
-    df["trend_7"] = df["tickets"] - df["tickets"].shift(7)
+    df["trend_7"] = src - src.shift(7)
 
     return df
 
@@ -50,18 +54,35 @@ def temporal_train_test(df_feats: pd.DataFrame, test_days: int = 28) -> tuple[pd
     return train, test
 
 
-def train_random_forest(df_daily: pd.DataFrame, test_days: int = 28, seed: int = 42) -> tuple[Pipeline, dict]:
+def train_random_forest(
+    df_daily: pd.DataFrame,
+    test_days: int = 28,
+    seed: int = 42,
+    mask_anomalies: bool = False,
+) -> tuple[Pipeline, dict]:
     """
     Treina um RandomForestRegressor com pipeline (API-ready).
+    mask_anomalies: dias anômalos (incidentes) viram a mediana esperada no cálculo
+    de lags/médias e saem do treino (o teste continua com todos os dias).
     Retorna: pipeline treinado, metadata (métricas e features)
     """
-    feats = make_features(df_daily)
+    if mask_anomalies:
+        flagged = flag_anomalies(df_daily)
+        flagged["tickets_clean"] = flagged["tickets"].where(~flagged["is_anomaly"], flagged["expected"])
+        feats = make_features(flagged, source_col="tickets_clean")
+    else:
+        feats = make_features(df_daily)
 
     # remove linhas iniciais com NaN (por causa de lag/rolling)
     feats = feats.dropna(subset=["lag_7", "roll_14"]).reset_index(drop=True)
 
     train, test = temporal_train_test(feats, test_days=test_days)
 
+    masked_dates: list[str] = []
+    if mask_anomalies:
+        masked_dates = train.loc[train["is_anomaly"], "date"].dt.strftime("%Y-%m-%d").tolist()
+        train = train[~train["is_anomaly"]].copy()
+
     feature_cols_num = ["lag_1", "lag_7", "roll_7", "roll_14", "trend_7"]
     feature_cols_cat = ["dow"]
 
@@ -95,6 +116,8 @@ def train_random_forest(df_daily: pd.DataFrame, test_days: int = 28, seed: int =
         "model_type": "RandomForestRegressor",
         "test_days": int(test_days),
         "seed": int(seed),
+        "mask_anomalies": bool(mask_anomalies),
+        "masked_train_dates": masked_dates,
         "feature_cols_num": feature_cols_num,
         "feature_cols_cat": feature_cols_cat,
         "y_test": y_test.tolist(),
@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.synthetic_data import (
+    DOW_FACTORS,
+    HOUR_MU,
+    HOUR_SIGMA,
+    INCIDENT_MULT_RANGE,
+    INCIDENT_PROB,
+)
+
+
+def gaussian_hour_profile(mu: float = HOUR_MU, sigma: float = HOUR_SIGMA) -> np.ndarray:
+    """
+    Distribuição (24 horas) equivalente a int(min(23, max(0, gauss(mu, sigma)))),
+    a mesma regra usada em synthetic_data.py.
+    """
+    # fronteiras entre as horas 0|1, 1|2, ..., 22|23
+    edges = np.arange(1, 24, dtype=float)
+    cdf = np.array([0.5 * (1.0 + math.erf((e - mu) / (sigma * math.sqrt(2.0)))) for e in edges])
+    probs = np.diff(np.concatenate([[0.0], cdf, [1.0]]))
+    return probs / probs.sum()
+
+
+@dataclass(frozen=True)
+class DemandParams:
+    """
+    Parâmetros do processo de demanda diária (mesmo formato do gerador sintético):
+    volume = int(base * dow_factor), base ~ U[base_min, base_max], e com
+    probabilidade incident_prob o dia vira incidente (volume * U[mult_range]).
+    """
+    dow_factors: tuple[float, ...] = tuple(DOW_FACTORS[d] for d in range(7))
+    base_min: int = 40
+    base_max: int = 140
+    incident_prob: float = INCIDENT_PROB
+    incident_mult_range: tuple[float, float] = INCIDENT_MULT_RANGE
+    hour_profile: tuple[float, ...] = field(default_factory=lambda: tuple(gaussian_hour_profile()))
+
+    def max_daily_volume(self) -> int:
+        """Limite superior do volume diário que o processo consegue gerar."""
+        return int(math.ceil(self.base_max * max(self.dow_factors) * self.incident_mult_range[1]))
+
+
+def _incident_visibility(
+    base_min: float,
+    base_max: float,
+    mult_range: tuple[float, float],
+    threshold: float | None = None,
+) -> float:
+    """
+    Fração dos incidentes cujo volume base * mult passa de threshold (padrão: base_max),
+    integrando sobre a base e o multiplicador uniformes. Só esses são separáveis dos dias normais.
+    """
+    threshold = base_max if threshold is None else threshold
+    mult = np.linspace(mult_range[0], mult_range[1], 101)
+    width = max(base_max - base_min, 1e-9)
+    p_visible = np.clip((base_max - threshold / mult) / width, 0.0, 1.0)
+    return float(max(p_visible.mean(), 1e-9))
+
+
+def _uniform_support(values: np.ndarray, tail: float) -> tuple[float, float]:
+    """Suporte [a, b] de uma uniforme a partir dos quantis tail e 1 - tail (extrapolados)."""
+    q_lo, q_hi = np.percentile(values, [100 * tail, 100 * (1 - tail)])
+    ext = tail / (1 - 2 * tail) * (q_hi - q_lo)
+    return q_lo - ext, q_hi + ext
+
+
+def fit_demand_params(
+    df_daily: pd.DataFrame,
+    hour_profile: np.ndarray | None = None,
+    incident_mult_range: tuple[float, float] = INCIDENT_MULT_RANGE,
+    tail: float = 0.05,
+    incident_margin: float = 0.10,
+) -> DemandParams:
+    """
+    Estima DemandParams a partir da série diária (columns: date, tickets).
+    - dow_factors: ponto médio entre os quantis tail e 1 - tail por dia da semana
+      (normalizado para média 1)
+    - base_min/base_max: suporte da uniforme extrapolado dos mesmos quantis do volume
+      "base" (volume / dow_factor)
+    - incidentes: dias com base acima de base_max * (1 + incident_margin); incident_prob
+      é corrigido pela fração de incidentes que fica abaixo desse limiar
+    Duas passadas: a segunda reestima fatores e suporte sem os incidentes da primeira.
+    A margem absorve o ruído dos fatores (~58 dias por dia da semana num ano): sem ela,
+    dias normais com fator subestimado passam de base_max e inflam incident_prob.
+    O multiplicador dos incidentes não é identificável só pelo total diário (a base
+    uniforme é larga demais), então vem de incident_mult_range (padrão do gerador).
+    Ver check_fit_recovery.
+    """
+    df = df_daily.sort_values("date").reset_index(drop=True)
+    y = df["tickets"].astype(float).to_numpy()
+    dow = pd.to_datetime(df["date"]).dt.dayofweek.to_numpy()
+    if len(y) < 14:
+        raise ValueError("Série muito curta para ajustar o simulador (mínimo 14 dias).")
+
+    normal = np.ones(len(y), dtype=bool)
+    for _ in range(2):
+        mid = np.array([
+            np.mean(_uniform_support(y[normal & (dow == d)], tail)) if (normal & (dow == d)).any() else np.nan
+            for d in range(7)
+        ])
+        # fallback: valor global caso algum dow não exista no histórico
+        mid = np.where(np.isnan(mid), np.nanmean(mid), mid)
+        factors = mid / mid.mean()
+
+        # volume "base" (sem efeito do dia da semana)
+        z = y / factors[dow]
+        base_min, base_max = _uniform_support(z[normal], tail)
+        base_min = max(0.0, base_min)
+        threshold = base_max * (1.0 + incident_margin)
+        normal = z <= threshold
+
+    visibility = _incident_visibility(base_min, base_max, incident_mult_range, threshold)
+    incident_prob = min(1.0, float((~normal).mean()) / visibility)
+
+    profile = gaussian_hour_profile() if hour_profile is None else np.asarray(hour_profile, dtype=float)
+
+    return DemandParams(
+        dow_factors=tuple(float(f) for f in factors),
+        base_min=int(math.floor(base_min)),
+        base_max=int(math.ceil(base_max)),
+        incident_prob=incident_prob,
+        incident_mult_range=tuple(incident_mult_range),
+        hour_profile=tuple(float(p) for p in profile / profile.sum()),
+    )
+
+
+def fit_hourly_profile(df_hourly: pd.DataFrame) -> np.ndarray:
+    """
+    Distribuição empírica de chamados por hora do dia (24 posições, soma 1) a partir da
+    série horária validada (columns: hour, tickets; ver build_series_validated).
+    """
+    by_hour = df_hourly.groupby(pd.to_datetime(df_hourly["hour"]).dt.hour)["tickets"].sum()
+    counts = by_hour.reindex(range(24), fill_value=0).to_numpy(dtype=float)
+    if counts.sum() == 0:
+        raise ValueError("Nenhum chamado na série horária para estimar o perfil horário.")
+    return counts / counts.sum()
+
+
+def simulate_daily(
+    params: DemandParams,
+    start_date: str | pd.Timestamp,
+    horizon: int,
+    n_paths: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Gera uma matriz (n_paths, horizon) de volumes diários, toda em NumPy.
+    """
+    dows = pd.date_range(start=start_date, periods=horizon, freq="D").dayofweek.to_numpy()
+    factors = np.asarray(params.dow_factors, dtype=float)[dows]
+
+    base = rng.integers(params.base_min, params.base_max + 1, size=(n_paths, horizon))
+    vol = np.floor(base * factors)
+
+    lo, hi = params.incident_mult_range
+    incident = rng.random(size=(n_paths, horizon)) < params.incident_prob
+    mult = rng.uniform(lo, hi, size=(n_paths, horizon))
+    vol = np.where(incident, np.floor(vol * mult), vol)
+
+    return vol.astype(np.int64)
+
+
+def simulate_hourly(daily: np.ndarray, params: DemandParams, rng: np.random.Generator) -> np.ndarray:
+    """
+    Distribui cada volume diário nas 24 horas (multinomial com o perfil horário).
+    Retorna (n_paths, horizon, 24); use reshape(n_paths, -1) para a matriz horária plana.
+    Custo: ~0.5 s por 10 mil caminhos x 28 dias (uma amostra multinomial por dia),
+    bem acima da parte diária.
+    """
+    pvals = np.asarray(params.hour_profile, dtype=float)
+    return rng.multinomial(daily, pvals / pvals.sum())
+
+
+def iter_simulated_paths(
+    params: DemandParams,
+    start_date: str | pd.Timestamp,
+    horizon: int,
+    n_paths: int,
+    chunk_size: int = 10_000,
+    seed: int = 42,
+    hourly: bool = False,
+) -> Iterator[tuple[np.ndarray, np.ndarray | None]]:
+    """
+    Gera os caminhos em blocos de até chunk_size (memória limitada ao bloco).
+    Cada item: (daily, hourly) — hourly é None se hourly=False.
+    Reprodutível para o mesmo (seed, chunk_size).
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size precisa ser positivo.")
+    if n_paths < 1 or horizon < 1:
+        raise ValueError("n_paths e horizon precisam ser >= 1.")
+
+    rng = np.random.default_rng(seed)
+    remaining = n_paths
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        daily = simulate_daily(params, start_date, horizon, size, rng)
+        yield daily, (simulate_hourly(daily, params, rng) if hourly else None)
+        remaining -= size
+
+
+def estimate_overflow_risk(
+    params: DemandParams,
+    start_date: str | pd.Timestamp,
+    horizon: int,
+    capacity: float | np.ndarray,
+    n_paths: int = 100_000,
+    chunk_size: int = 10_000,
+    seed: int = 42,
+    hourly_capacity: float | None = None,
+    quantiles: tuple[float, ...] = (0.5, 0.9, 0.95, 0.99),
+) -> dict:
+    """
+    Estatísticas de cauda via Monte Carlo, acumuladas bloco a bloco:
+    - p_over: P(volume > capacidade) por dia
+    - expected_excess: E[max(0, volume - capacidade)] por dia
+    - pXX: quantis exatos do volume por dia (histograma de contagens inteiras)
+    - p_any_over: P(pelo menos um dia acima da capacidade no horizonte)
+    - p_hour_over / p_any_hour_over: idem por hora (se hourly_capacity)
+    capacity pode ser escalar ou um array com um valor por dia do horizonte.
+    Com hourly_capacity cada dia simulado é quebrado em horas (simulate_hourly), o que
+    custa ~50x mais: 1 milhão de caminhos x 28 dias leva perto de 1 minuto.
+    """
+    if n_paths < 1 or horizon < 1:
+        raise ValueError("n_paths e horizon precisam ser >= 1.")
+
+    cap = np.broadcast_to(np.asarray(capacity, dtype=float), (horizon,))
+    use_hourly = hourly_capacity is not None
+
+    width = params.max_daily_volume() + 1
+    hist = np.zeros(horizon * width, dtype=np.int64)
+    offsets = np.arange(horizon) * width
+
+    n_over = np.zeros(horizon, dtype=np.int64)
+    excess_sum = np.zeros(horizon, dtype=float)
+    n_any_over = 0
+    n_hour_over = np.zeros(horizon, dtype=np.int64)
+    n_any_hour_over = 0
+
+    for daily, hourly in iter_simulated_paths(
+        params, start_date, horizon, n_paths, chunk_size=chunk_size, seed=seed, hourly=use_hourly
+    ):
+        over = daily > cap
+        n_over += over.sum(axis=0)
+        n_any_over += int(over.any(axis=1).sum())
+        excess_sum += np.maximum(daily - cap, 0.0).sum(axis=0)
+
+        idx = np.minimum(daily, width - 1) + offsets
+        hist += np.bincount(idx.ravel(), minlength=horizon * width)
+
+        if use_hourly:
+            hour_over = (hourly > hourly_capacity).any(axis=2)
+            n_hour_over += hour_over.sum(axis=0)
+            n_any_hour_over += int(hour_over.any(axis=1).sum())
+
+    cdf = hist.reshape(horizon, width).cumsum(axis=1) / n_paths
+
+    by_day = pd.DataFrame({
+        "date": pd.date_range(start=start_date, periods=horizon, freq="D"),
+        "capacity": cap,
+        "p_over": n_over / n_paths,
+        "expected_excess": excess_sum / n_paths,
+    })
+    for q in quantiles:
+        by_day[f"p{q * 100:g}"] = np.argmax(cdf >= q, axis=1)
+
+    result = {
+        "n_paths": int(n_paths),
+        "horizon": int(horizon),
+        "p_any_over": n_any_over / n_paths,
+        "by_day": by_day,
+    }
+
+    if use_hourly:
+        by_day["p_hour_over"] = n_hour_over / n_paths
+        result["hourly_capacity"] = float(hourly_capacity)
+        result["p_any_hour_over"] = n_any_hour_over / n_paths
+
+    return result
+
+
+def check_fit_recovery(
+    true_params: DemandParams | None = None,
+    n_days: int = 411,
+    seeds: range = range(30),
+    capacity: float = 150,
+    horizon: int = 28,
+    n_paths: int = 20_000,
+    prob_tol: float = 0.01,
+    risk_tol: float = 0.05,
+) -> pd.DataFrame:
+    """
+    Checagem de recuperação do ajuste: gera séries diárias com true_params (mesmo processo
+    do gerador sintético), reajusta com fit_demand_params e compara incident_prob e
+    p_any_over com os valores verdadeiros.
+    Cada série sozinha é ruidosa (~12 incidentes por ano), então a checagem é sobre a
+    média entre seeds: levanta AssertionError se |média - verdade| passar da tolerância.
+    Retorna uma linha por seed (incident_prob, p_any_over).
+    """
+    params = DemandParams() if true_params is None else true_params
+    start = pd.Timestamp("2025-01-01")
+    forecast_start = start + pd.Timedelta(days=n_days)
+
+    def risk(p: DemandParams) -> float:
+        result = estimate_overflow_risk(p, forecast_start, horizon, capacity, n_paths=n_paths, seed=0)
+        return result["p_any_over"]
+
+    rows = []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        y = simulate_daily(params, start, n_days, 1, rng)[0]
+        df = pd.DataFrame({"date": pd.date_range(start, periods=n_days, freq="D"), "tickets": y})
+        fitted = fit_demand_params(df, hour_profile=np.asarray(params.hour_profile))
+        rows.append({"seed": seed, "incident_prob": fitted.incident_prob, "p_any_over": risk(fitted)})
+    out = pd.DataFrame(rows)
+
+    true_prob, true_risk = params.incident_prob, risk(params)
+    mean_prob, mean_risk = out["incident_prob"].mean(), out["p_any_over"].mean()
+    assert abs(mean_prob - true_prob) <= prob_tol, (
+        f"incident_prob ajustado {mean_prob:.4f} longe do verdadeiro {true_prob:.4f}"
+    )
+    assert abs(mean_risk - true_risk) <= risk_tol, (
+        f"p_any_over ajustado {mean_risk:.3f} longe do verdadeiro {true_risk:.3f}"
+    )
+    out.attrs.update(true_incident_prob=true_prob, true_p_any_over=true_risk)
+    return out
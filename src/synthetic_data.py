@@ -16,6 +16,33 @@ class TicketRow:
     queue: str
 
 
+# padrão típico: seg/ter alto, fim de semana baixo (0=Mon..6=Sun)
+DOW_FACTORS: dict[int, float] = {
+    0: 1.20,  # segunda
+    1: 1.10,
+    2: 1.00,
+    3: 0.95,
+    4: 0.90,  # sexta
+    5: 0.55,  # sábado
+    6: 0.50,  # domingo
+}
+
+CATEGORIES = [
+    "Acesso/Conta", "VPN/Conectividade", "Email", "Hardware",
+    "Software", "Impressão", "Telefonia", "Rede/Internet"
+]
+PRIORITIES = ["P4", "P3", "P2", "P1"]  # P1 mais crítico
+QUEUES = ["ServiceDesk-N1", "ServiceDesk-N2", "Field", "Infra"]
+
+# picos (tipo incidente): ~3% dos dias, volume multiplicado por 1.6x-2.4x
+INCIDENT_PROB = 0.03
+INCIDENT_MULT_RANGE = (1.6, 2.4)
+
+# horários concentrados 08h-18h (com ruído)
+HOUR_MU = 13.0
+HOUR_SIGMA = 3.0
+
+
 def _daterange(start: date, end: date):
     cur = start
     while cur <= end:
@@ -43,57 +70,40 @@ def generate_synthetic_tickets_csv(
     start = date.fromisoformat(start_date)
     end = date.fromisoformat(end_date)
 
-    categories = [
-        "Acesso/Conta", "VPN/Conectividade", "Email", "Hardware",
-        "Software", "Impressão", "Telefonia", "Rede/Internet"
-    ]
-    priorities = ["P4", "P3", "P2", "P1"]  # P1 mais crítico
-    queues = ["ServiceDesk-N1", "ServiceDesk-N2", "Field", "Infra"]
-
     rows: list[TicketRow] = []
     counter = 1
 
     for day in _daterange(start, end):
         dow = day.weekday()  # 0=Mon..6=Sun
-        # padrão típico: seg/ter alto, fim de semana baixo
-        dow_factor = {
-            0: 1.20,  # segunda
-            1: 1.10,
-            2: 1.00,
-            3: 0.95,
-            4: 0.90,  # sexta
-            5: 0.55,  # sábado
-            6: 0.50,  # domingo
-        }[dow]
+        dow_factor = DOW_FACTORS[dow]
 
         base = random.randint(daily_min, daily_max)
         n = int(base * dow_factor)
 
         # picos (tipo incidente): ~3% dos dias
-        if random.random() < 0.03:
-            n = int(n * random.uniform(1.6, 2.4))
+        if random.random() < INCIDENT_PROB:
+            n = int(n * random.uniform(*INCIDENT_MULT_RANGE))
 
         for _ in range(n):
-            # horários concentrados 08h-18h (com ruído)
-            hour = int(min(23, max(0, random.gauss(mu=13, sigma=3))))
+            hour = int(min(23, max(0, random.gauss(mu=HOUR_MU, sigma=HOUR_SIGMA))))
             minute = random.randint(0, 59)
             second = random.randint(0, 59)
             created = datetime(day.year, day.month, day.day, hour, minute, second).isoformat(sep=" ")
 
             cat = random.choices(
-                categories,
+                CATEGORIES,
                 weights=[18, 14, 12, 10, 16, 8, 6, 16],
                 k=1
             )[0]
 
             pr = random.choices(
-                priorities,
+                PRIORITIES,
                 weights=[55, 30, 12, 3],  # maioria P4/P3
                 k=1
             )[0]
 
             q = random.choices(
-                queues,
+                QUEUES,
                 weights=[60, 22, 8, 10],
                 k=1
             )[0]
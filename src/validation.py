@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import csv
+import io
+from itertools import islice
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.synthetic_data import CATEGORIES, PRIORITIES, QUEUES
+
+RAW_COLUMNS = ["ticket_id", "created_at", "category", "priority", "queue"]
+CREATED_AT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+ALLOWED_VALUES: dict[str, list[str]] = {
+    "category": CATEGORIES,
+    "priority": PRIORITIES,
+    "queue": QUEUES,
+}
+
+# ordem de checagem: cada linha recebe só o primeiro motivo de rejeição
+REJECT_REASONS = [
+    "malformed_row",
+    "invalid_ticket_id",
+    "invalid_created_at",
+    "invalid_category",
+    "invalid_priority",
+    "invalid_queue",
+    "duplicate_ticket_id",
+]
+
+# Pico de memória ~600 bytes por linha do bloco (strings do pandas + matriz de code
+# points do decode): ~150 MB com 250 mil linhas. O conjunto de ids soma 8 bytes por id único.
+DEFAULT_CHUNKSIZE = 250_000
+
+# TCK-YYYYMMDD-NNNNNN: o gerador usa um contador global com zero-padding de 6 dígitos
+# ({counter:06d}), que passa a 7+ dígitos depois de 999.999 chamados. Aceitamos de 6 a 9.
+_PREFIX = "TCK-"
+_SEQ_START = 13
+_MIN_SEQ_DIGITS = 6
+_MAX_SEQ_DIGITS = 9
+_MAX_ID_LEN = _SEQ_START + _MAX_SEQ_DIGITS
+_SEQ_SPACE = 10 ** _MAX_SEQ_DIGITS
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def decode_ticket_ids(ids: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Decodifica ids TCK-YYYYMMDD-N...N (6 a 9 dígitos) para int64 YYYYMMDD * 10^9 + N,
+    sem criar objetos Python por linha (trabalha sobre os code points em NumPy).
+    Valida a data de calendário (ex.: 20250230 é inválido) e exige a forma canônica
+    do sufixo: mais de 6 dígitos só sem zero à esquerda.
+    Retorna: packed (int64, 0 onde inválido), valid (bool)
+    """
+    # um caractere a mais que o maior formato, para detectar ids longos demais.
+    # Uma linha por posição (contígua): cada checagem abaixo é uma passada 1-D.
+    width = _MAX_ID_LEN + 1
+    points = np.asarray(ids.fillna(""), dtype=f"U{width}").view(np.uint32).reshape(-1, width)
+    cols = np.ascontiguousarray(points.T)
+
+    def digit(col: np.ndarray) -> np.ndarray:
+        # aritmética uint32 sem narrowing: tudo fora de '0'..'9' (inclusive code points
+        # não ASCII) dá a volta e fica > 9
+        return col - np.uint32(ord("0"))
+
+    valid = np.ones(cols.shape[1], dtype=bool)
+    for pos, ch in enumerate(_PREFIX):
+        valid &= cols[pos] == ord(ch)
+    valid &= cols[12] == ord("-")
+
+    day = np.zeros(cols.shape[1], dtype=np.int64)
+    for col in cols[4:12]:
+        d = digit(col)
+        valid &= d <= 9
+        day = day * 10 + d
+
+    # sufixo de tamanho variável: dígitos até o fim do id e nada (nem NUL embutido) depois
+    n_seq = np.count_nonzero(cols, axis=0) - _SEQ_START
+    valid &= (n_seq >= _MIN_SEQ_DIGITS) & (n_seq <= _MAX_SEQ_DIGITS)
+    valid &= (n_seq == _MIN_SEQ_DIGITS) | (cols[_SEQ_START] != ord("0"))
+    seq = np.zeros(cols.shape[1], dtype=np.int64)
+    for k, col in enumerate(cols[_SEQ_START:]):
+        inside = k < n_seq
+        d = digit(col)
+        valid &= np.where(inside, d <= 9, col == 0)
+        seq = np.where(inside, seq * 10 + d, seq)
+
+    year, month, dom = day // 10000, (day // 100) % 100, day % 100
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_ok = (month >= 1) & (month <= 12)
+    dim = _DAYS_IN_MONTH[np.clip(month - 1, 0, 11)] + ((month == 2) & leap)
+    valid &= month_ok & (dom >= 1) & (dom <= dim)
+
+    packed = np.where(valid, day * _SEQ_SPACE + seq, 0)
+    return packed, valid
+
+
+class PackedTicketIdSet:
+    """
+    Conjunto de ticket_ids já vistos (int64 empacotados), guardado como poucas
+    sequências ordenadas e disjuntas, fundidas em tamanhos geométricos (estilo LSM):
+    - memória: 8 bytes por id único, sem depender de como o sufixo é numerado
+    - consulta: np.searchsorted em cada sequência (O(log n) sequências)
+    - inserção: merge amortizado O(log n) por id, tudo em NumPy (sem loop por dia)
+    """
+
+    def __init__(self) -> None:
+        self._runs: list[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._runs)
+
+    def _contains(self, keys: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self._runs:
+            idx = np.searchsorted(run, keys)
+            hit = idx < len(run)
+            found[hit] |= run[idx[hit]] == keys[hit]
+        return found
+
+    def add(self, packed: np.ndarray) -> np.ndarray:
+        """
+        Registra os ids e retorna máscara True para a primeira ocorrência de cada um
+        (False = já visto antes ou repetido dentro do próprio lote).
+        """
+        is_new = np.zeros(len(packed), dtype=bool)
+        keys, first = np.unique(packed, return_index=True)
+
+        unseen = ~self._contains(keys)
+        is_new[first[unseen]] = True
+
+        run = keys[unseen]
+        if len(run):
+            self._runs.append(run)
+            # funde enquanto a penúltima não for bem maior que a última
+            while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+                last = self._runs.pop()
+                merged = np.concatenate([self._runs.pop(), last])
+                merged.sort(kind="stable")  # timsort: duas sequências já ordenadas -> O(n)
+                self._runs.append(merged)
+
+        return is_new
+
+
+class _FieldCounter:
+    """
+    Nº de campos de cada registro do CSV, lido direto dos bytes em paralelo ao read_csv
+    (que com usecols ignora campos a mais). Mesmas regras do read_csv: linhas vazias ou
+    só com espaços não são registros. Sem aspas, registro = linha e campos = vírgulas + 1,
+    contados em NumPy por bloco; a partir do primeiro bloco com aspas (campo pode ter
+    vírgula ou quebra de linha) o resto do arquivo vai pelo csv.reader, mais lento.
+    """
+
+    _BLOCK_BYTES = 1 << 22
+    _SPACE = np.array([b" "[0], b"\t"[0], b"\r"[0]], dtype=np.uint8)
+
+    def __init__(self, path: Path) -> None:
+        self._file = open(path, "rb")
+        self._tail = b""
+        self._counts = np.empty(0, dtype=np.int64)
+        self._reader: Iterator[list[str]] | None = None
+        self._eof = False
+
+    def close(self) -> None:
+        self._file.close()
+
+    def take(self, n: int) -> np.ndarray:
+        """Campos dos próximos n registros (ValueError se o arquivo acabar antes)."""
+        while len(self._counts) < n and not self._eof:
+            self._counts = np.concatenate([self._counts, self._read_more()])
+        if len(self._counts) < n:
+            raise ValueError("Contagem de campos divergiu do read_csv (registros a menos).")
+        out, self._counts = self._counts[:n], self._counts[n:]
+        return out
+
+    def exhausted(self) -> bool:
+        while not len(self._counts) and not self._eof:
+            self._counts = self._read_more()
+        return not len(self._counts)
+
+    def _read_more(self) -> np.ndarray:
+        if self._reader is not None:
+            rows = list(islice(self._reader, 100_000))
+            self._eof = not rows
+            return np.array(
+                [len(r) for r in rows if len(r) > 1 or (r and r[0].strip())], dtype=np.int64
+            )
+
+        data = self._file.read(self._BLOCK_BYTES)
+        buf = self._tail + data
+        if b'"' in buf:
+            # volta ao início do bloco (fim de linha, fora de aspas) e segue pelo csv.reader
+            self._file.seek(self._file.tell() - len(buf))
+            self._reader = csv.reader(io.TextIOWrapper(self._file, encoding="utf-8", newline=""))
+            return np.empty(0, dtype=np.int64)
+        if not data:
+            self._eof = True
+            buf += b"\n" if buf else b""
+
+        cut = buf.rfind(b"\n") + 1
+        lines, self._tail = buf[:cut], buf[cut:]
+        b = np.frombuffer(lines, dtype=np.uint8)
+        ends = np.flatnonzero(b == ord("\n"))
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        # vírgulas antes de cada fim de linha, pelas posições (sem cumsum por byte)
+        commas_before = np.searchsorted(np.flatnonzero(b == ord(",")), ends)
+        n_fields = np.diff(commas_before, prepend=0) + 1
+
+        # só linha sem vírgula pode ser vazia: checa espaços apenas nessas
+        blank = np.zeros(len(ends), dtype=bool)
+        single = np.flatnonzero(n_fields == 1)
+        if len(single):
+            solid = np.concatenate([[0], np.cumsum(~np.isin(b, self._SPACE) & (b != ord("\n")))])
+            blank[single] = solid[ends[single]] == solid[starts[single]]
+        return n_fields[~blank]
+
+
+def iter_valid_tickets(
+    raw_csv_path: Path,
+    rejects_csv_path: Path,
+    counters: dict[str, int],
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    allowed_values: dict[str, list[str]] | None = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Valida o CSV raw em blocos (memória: bloco + 8 bytes por id único, ver DEFAULT_CHUNKSIZE):
+    - mesmo nº de campos do header (linha malformada vira malformed_row)
+    - ticket_id no formato TCK-YYYYMMDD-N...N (ver decode_ticket_ids) e sem duplicidade
+      (mantém a 1ª ocorrência)
+    - created_at no formato YYYY-MM-DD HH:MM:SS
+    - category/priority/queue dentro dos dicionários (ALLOWED_VALUES)
+    Gera os blocos válidos (created_at já convertido para datetime); as linhas
+    rejeitadas vão para rejects_csv_path com a coluna reject_reason.
+    counters é preenchido in-place (rows_read, rows_valid e um por motivo).
+    """
+    allowed = ALLOWED_VALUES if allowed_values is None else allowed_values
+    reasons = REJECT_REASONS + [f"invalid_{col}" for col in allowed if f"invalid_{col}" not in REJECT_REASONS]
+    code = {r: i + 1 for i, r in enumerate(reasons)}  # 0 = linha válida
+    labels = np.array([""] + reasons, dtype=object)
+
+    counters.update({"rows_read": 0, "rows_valid": 0, **{r: 0 for r in reasons}})
+    seen = PackedTicketIdSet()
+
+    rejects_csv_path.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(columns=RAW_COLUMNS + ["reject_reason"]).to_csv(rejects_csv_path, index=False)
+
+    # usecols descarta campos a mais em silêncio: compara cada registro com o header
+    fields = _FieldCounter(raw_csv_path)
+    n_header = int(fields.take(1)[0])
+
+    # colunas de dicionário como category: isin compara só as categorias do bloco
+    dtypes = {col: ("category" if col in allowed else str) for col in RAW_COLUMNS}
+    reader = pd.read_csv(
+        raw_csv_path,
+        usecols=RAW_COLUMNS,
+        dtype=dtypes,
+        keep_default_na=False,
+        chunksize=chunksize,
+    )
+
+    try:
+        for chunk in reader:
+            chunk = chunk[RAW_COLUMNS]
+            reason = np.zeros(len(chunk), dtype=np.uint8)
+
+            def reject(mask: np.ndarray, label: str) -> None:
+                reason[mask & (reason == 0)] = code[label]
+
+            reject(fields.take(len(chunk)) != n_header, "malformed_row")
+
+            packed, id_ok = decode_ticket_ids(chunk["ticket_id"])
+            reject(~id_ok, "invalid_ticket_id")
+
+            created = pd.to_datetime(chunk["created_at"], format=CREATED_AT_FORMAT, errors="coerce")
+            reject(created.isna().to_numpy(), "invalid_created_at")
+
+            for col, values in allowed.items():
+                reject(~chunk[col].isin(values).to_numpy(), f"invalid_{col}")
+
+            # dedup só entre linhas válidas: uma reentrega corrigida ainda é aceita
+            ok = reason == 0
+            dup = np.zeros(len(chunk), dtype=bool)
+            dup[ok] = ~seen.add(packed[ok])
+            reject(dup, "duplicate_ticket_id")
+
+            ok = reason == 0
+            if not ok.all():
+                rejects = chunk[~ok].assign(reject_reason=labels[reason[~ok]])
+                rejects.to_csv(rejects_csv_path, index=False, mode="a", header=False)
+
+            per_code = np.bincount(reason, minlength=len(labels))
+            counters["rows_read"] += len(chunk)
+            counters["rows_valid"] += int(per_code[0])
+            for r in reasons:
+                counters[r] += int(per_code[code[r]])
+
+            yield chunk[ok].assign(created_at=created[ok])
+
+        if not fields.exhausted():
+            raise ValueError("Contagem de campos divergiu do read_csv (registros a mais).")
+    finally:
+        fields.close()
+
+
+def validate_raw_tickets(
+    raw_csv_path: Path,
+    clean_csv_path: Path,
+    rejects_csv_path: Path,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    allowed_values: dict[str, list[str]] | None = None,
+) -> dict[str, int]:
+    """
+    Gera um CSV raw limpo (mesmas colunas) a partir de iter_valid_tickets.
+    Retorna os contadores da validação.
+    """
+    clean_csv_path.parent.mkdir(parents=True, exist_ok=True)
+    counters: dict[str, int] = {}
+
+    chunks = iter_valid_tickets(raw_csv_path, rejects_csv_path, counters, chunksize, allowed_values)
+    for i, chunk in enumerate(chunks):
+        mode, header = ("w", True) if i == 0 else ("a", False)
+        chunk.to_csv(clean_csv_path, index=False, mode=mode, header=header, date_format=CREATED_AT_FORMAT)
+
+    return counters